@@ -1,6 +1,9 @@
 
+import functools
 import json
+import multiprocessing
 import os
+import threading
 import warnings
 
 import numpy as np
@@ -10,6 +13,95 @@ import shorttext.utils.classification_exceptions as e
 from shorttext.utils import tokenize
 from shorttext.utils.compactmodel_io import CompactIOMachine
 
+# minimum number of sentences before tokenization is farmed out to worker
+# processes; raise it to push more work onto the serial path, or set it to
+# None to disable the fan-out altogether
+MIN_PARALLEL_TOKENIZE = 10000
+
+# number of tokenization worker processes; None means one per core. On spawn
+# platforms each worker re-imports the whole package, so a small count is
+# advisable on shared machines. Takes effect when the pool is first created.
+NB_TOKENIZER_PROCESSES = None
+
+# shared pool of tokenization worker processes, created lazily and kept alive
+# so that repeated calls of `train` do not pay process start-up again
+_tokenizer_pool = None
+
+
+def _tokenize_text(shorttext):
+    """ Tokenize the given short sentence.
+
+    A module-level wrapper of :func:`~shorttext.utils.tokenize`,
+    so that it can be shipped to worker processes.
+
+    :param shorttext: a short sentence
+    :return: list of tokens
+    :type shorttext: str
+    :rtype: list
+    """
+    return tokenize(shorttext)
+
+
+def _get_tokenizer_pool():
+    """ Return the shared pool of tokenization worker processes, creating it on first use.
+
+    The number of workers is given by the module setting `NB_TOKENIZER_PROCESSES`.
+
+    :return: pool of worker processes
+    :rtype: multiprocessing.pool.Pool
+    """
+    global _tokenizer_pool
+    if _tokenizer_pool is None:
+        _tokenizer_pool = multiprocessing.Pool(NB_TOKENIZER_PROCESSES)
+    return _tokenizer_pool
+
+
+def shutdown_tokenizer_pool():
+    """ Terminate the shared pool of tokenization worker processes, if it exists.
+
+    A new pool is created, with the current module settings, the next time
+    parallel tokenization is needed.
+
+    :return: None
+    """
+    global _tokenizer_pool
+    if _tokenizer_pool is not None:
+        _tokenizer_pool.terminate()
+        _tokenizer_pool = None
+
+
+# numba is optional; without it, the embedding matrices are packed with a
+# NumPy gather instead of the jitted kernel
+try:
+    from numba import njit, prange
+    numba_available = True
+except ImportError:
+    numba_available = False
+
+
+if numba_available:
+    @njit(parallel=True, cache=True)
+    def _pack_embeddings(token_ids, vectors, out):
+        """ Write the embedded vectors of the given token indices into `out`.
+
+        Numba-jitted kernel that, for each sentence `i` and position `j`, copies
+        row `token_ids[i, j]` of `vectors` into `out[i, j]`. Entries of -1
+        (out-of-vocabulary tokens and padding) are skipped, leaving zero vectors.
+
+        :param token_ids: rank-2 int32 array of token indices, -1 for OOV/padding
+        :param vectors: matrix of embedded vectors of the word-embedding model
+        :param out: preallocated rank-3 output array, zero-filled
+        :return: None
+        :type token_ids: numpy.ndarray
+        :type vectors: numpy.ndarray
+        :type out: numpy.ndarray
+        """
+        for i in prange(token_ids.shape[0]):
+            for j in range(token_ids.shape[1]):
+                tokid = token_ids[i, j]
+                if tokid >= 0:
+                    out[i, j] = vectors[tokid]
+
 
 class VarNNEmbeddedVecClassifier(CompactIOMachine):
     """
@@ -29,23 +121,74 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
     A pre-trained Google Word2Vec model can be downloaded `here
     <https://drive.google.com/file/d/0B7XkCwpI5KDYNlNUTTlSS21pQmM/edit>`_.
     """
-    def __init__(self, wvmodel, vecsize=None, maxlen=15, with_gensim=False):
+    def __init__(self, wvmodel, vecsize=None, maxlen=15, with_gensim=False, dtype=np.float32,
+                 use_embedding_layer=False):
         """ Initialize the classifier.
 
         :param wvmodel: Word2Vec model
         :param vecsize: length of the embedded vectors in the model (Default: None, directly extracted from word-embedding model)
         :param maxlen: maximum number of words in a sentence (Default: 15)
+        :param dtype: data type of the embedded matrices fed into the neural network;
+            `numpy.float16` halves the input bandwidth again, and makes :func:`~train`
+            set Keras' global `mixed_float16` policy (Default: `numpy.float32`)
+        :param use_embedding_layer: whether to feed the network integer token indices,
+            with a frozen `Embedding` layer holding the word-embedding matrix prepended to it,
+            instead of matrices of embedded vectors; this divides the input bandwidth
+            by `vecsize`, but produces model files incompatible with models saved
+            without this flag (Default: False)
         :type wvmodel: gensim.models.keyedvectors.KeyedVectors
         :type vecsize: int
         :type maxlen: int
+        :type dtype: numpy.dtype
+        :type use_embedding_layer: bool
         """
         CompactIOMachine.__init__(self, {'classifier': 'nnlibvec'}, 'nnlibvec', ['_classlabels.txt', '.json', '.h5', '_config.json'])
         self.wvmodel = wvmodel
         self.vecsize = self.wvmodel.vector_size if vecsize == None else vecsize
         self.maxlen = maxlen
+        self.dtype = dtype
         self.with_gensim = False if not with_gensim else with_gensim
+        if self.with_gensim:
+            warnings.warn('The gensim tokenizer pipeline (with_gensim=True) is not available '
+                          'in this version; the word-embedding path is used instead.',
+                          RuntimeWarning)
         self.trained = False
 
+        # shared zero vector for out-of-vocabulary tokens, to avoid allocating
+        # a fresh array on every lookup miss
+        self._zero = np.zeros(self.vecsize, dtype=self.dtype)
+
+        # TFLite interpreter for a quantized model, set by `loadmodel`
+        self._tflite_interpreter = None
+
+        # per-thread scratch buffers for single-sentence conversion, allocated
+        # on first use in each thread, so concurrent scoring threads do not
+        # overwrite each other's buffer
+        self._scratch = threading.local()
+
+        # word-embedding matrix converted to the classifier's dtype, cached on
+        # first use since the conversion copies the whole matrix
+        self._vectors = None
+
+        # token-to-row mapping of the word-embedding model, for gathering many
+        # embedded vectors in one indexing operation
+        if hasattr(self.wvmodel, 'key_to_index'):
+            self._key_to_index = self.wvmodel.key_to_index
+        elif hasattr(self.wvmodel, 'vocab'):
+            self._key_to_index = {word: vocabitem.index for word, vocabitem in self.wvmodel.vocab.items()}
+        else:
+            self._key_to_index = None
+
+        self.use_embedding_layer = use_embedding_layer
+        if self.use_embedding_layer and self._key_to_index is None:
+            warnings.warn('The word-embedding model has no indexable matrix of vectors; '
+                          'feeding embedded vectors instead of token indices.', RuntimeWarning)
+            self.use_embedding_layer = False
+
+        # per-instance memoization of embedded matrices of single sentences,
+        # cleared whenever the underlying model changes
+        self._shorttext_to_matrix_cached = functools.lru_cache(maxsize=4096)(self._shorttext_to_matrix)
+
     def convert_trainingdata_matrix(self, classdict):
         """ Convert the training data into format put into the neural networks.
 
@@ -57,56 +200,265 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         :type classdict: dict
         :rtype: (list, numpy.ndarray, list)
         """
-        classlabels = classdict.keys()
+        classlabels, phrases, label_ids = self._convert_trainingdata_phrases(classdict)
+
+        # store embedded vectors, and gather the one-hot outputs from an identity matrix
+        train_embedvec = self.phrases_to_embedmatrix(phrases)
+        indices = np.eye(len(classlabels), dtype=np.float32)[label_ids]
+
+        # make sure the arrays handed to the network are C-contiguous in the expected
+        # dtypes, so that the input pipeline does not silently copy them again
+        train_embedvec = np.ascontiguousarray(train_embedvec, dtype=self.dtype)
+        indices = np.ascontiguousarray(indices, dtype=np.float32)
+
+        return classlabels, train_embedvec, indices
+
+    def _convert_trainingdata_phrases(self, classdict):
+        """ Flatten and tokenize the training data.
+
+        Flatten the training data into a list of tokenized sentences and an array of
+        label indices, filled in a single pass over preallocated arrays.
+        This is called by :func:`~convert_trainingdata_matrix` and by the streaming
+        path of :func:`~train`.
+
+        :param classdict: training data
+        :return: a tuple of three, containing a list of class labels, list of tokenized sentences, and array of label indices
+        :type classdict: dict
+        :rtype: (list, list, numpy.ndarray)
+        """
+        classlabels = list(classdict.keys())
         lblidx_dict = dict(zip(classlabels, range(len(classlabels))))
 
-        # tokenize the words, and determine the word length
-        phrases = []
-        indices = []
+        # filter out samples that are not strings once, so that the flattening
+        # loop below carries no per-sample type check
+        classdict = {label: [shorttext for shorttext in classdict[label] if isinstance(shorttext, str)]
+                     for label in classlabels}
+
+        # precount the samples, and flatten the training data into preallocated
+        # arrays of short sentences and label indices in a single pass
+        nb_samples = sum(len(classdict[label]) for label in classlabels)
+        shorttexts = [''] * nb_samples
+        label_ids = np.empty(nb_samples, dtype=np.int32)
+        k = 0
         for label in classlabels:
             for shorttext in classdict[label]:
-                shorttext = shorttext if type(shorttext)==str else ''
-                category_bucket = [0]*len(classlabels)
-                category_bucket[lblidx_dict[label]] = 1
-                indices.append(category_bucket)
-                phrases.append(tokenize(shorttext))
-
-        # store embedded vectors
-        train_embedvec = np.zeros(shape=(len(phrases), self.maxlen, self.vecsize))
-        for i in range(len(phrases)):
-            for j in range(min(self.maxlen, len(phrases[i]))):
-                train_embedvec[i, j] = self.word_to_embedvec(phrases[i][j])
-        indices = np.array(indices, dtype=np.int)
+                shorttexts[k] = shorttext
+                label_ids[k] = lblidx_dict[label]
+                k += 1
+
+        # tokenize the words, in parallel if the training data is large enough
+        # to amortize the inter-process communication
+        if MIN_PARALLEL_TOKENIZE is not None and len(shorttexts) >= MIN_PARALLEL_TOKENIZE:
+            phrases = _get_tokenizer_pool().map(_tokenize_text, shorttexts, chunksize=256)
+        else:
+            phrases = [tokenize(shorttext) for shorttext in shorttexts]
 
-        return classlabels, train_embedvec, indices
+        return classlabels, phrases, label_ids
+
+    def phrases_to_embedmatrix(self, phrases):
+        """ Convert tokenized sentences into a rank-3 array of embedded vectors.
+
+        Given a list of tokenized short sentences, compute the indices of all tokens
+        in the word-embedding model, and gather the corresponding embedded vectors
+        in a single indexing operation, instead of looking up the model word by word.
+        Tokens not in the model, and padded positions, are given zero vectors.
+        This is called by :func:`~convert_trainingdata_matrix`.
+
+        :param phrases: list of tokenized sentences
+        :return: a rank-3 array of embedded vectors representing the tokens of all the sentences
+        :type phrases: list
+        :rtype: numpy.ndarray
+        """
+        if self._key_to_index is None:
+            # word-by-word lookup, for word-embedding models without an indexable matrix
+            # of vectors; each distinct token is looked up only once, and its embedded
+            # vector is reused for all the occurrences
+            embedvec_of = {}
+            embedmatrix = np.zeros(shape=(len(phrases), self.maxlen, self.vecsize), dtype=self.dtype)
+            for i in range(len(phrases)):
+                for j in range(min(self.maxlen, len(phrases[i]))):
+                    token = phrases[i][j]
+                    if token not in embedvec_of:
+                        embedvec_of[token] = self.word_to_embedvec(token)
+                    embedmatrix[i, j] = embedvec_of[token]
+            return embedmatrix
+
+        idx = self._phrases_to_tokenids(phrases)
+        vectors = self._embedding_vectors()
+        embedmatrix = np.zeros((len(phrases), self.maxlen, self.vecsize), dtype=self.dtype)
+        # the jitted kernel is restricted to the dtypes numba's CPU target fully
+        # supports; half precision falls through to the NumPy gather
+        if numba_available and embedmatrix.dtype in (np.float32, np.float64):
+            _pack_embeddings(idx, vectors, embedmatrix)
+        else:
+            # a C-level gather over the contiguous matrix of vectors, with the
+            # out-of-vocabulary and padding rows zeroed out afterwards
+            oov = idx < 0
+            embedmatrix[:] = np.take(vectors, np.where(oov, 0, idx), axis=0)
+            embedmatrix[oov] = 0
+        return embedmatrix
+
+    def _embedding_vectors(self):
+        """ Return the word-embedding matrix, C-contiguous and in the classifier's dtype.
+
+        The conversion copies the whole matrix whenever its dtype differs from
+        that of the word-embedding model, so it is done once and cached.
+
+        :return: matrix of embedded vectors of the word-embedding model
+        :rtype: numpy.ndarray
+        """
+        if self._vectors is None:
+            self._vectors = np.ascontiguousarray(self.wvmodel.vectors, dtype=self.dtype)
+        return self._vectors
+
+    def _phrases_to_tokenids(self, phrases):
+        """ Map tokenized sentences to the row indices of their tokens in the word-embedding model.
 
-    def train(self, classdict, kerasmodel, nb_epoch=10):
+        Out-of-vocabulary tokens and padded positions are denoted by -1.
+
+        :param phrases: list of tokenized sentences
+        :return: rank-2 int32 array of token indices
+        :type phrases: list
+        :rtype: numpy.ndarray
+        """
+        idx = np.full((len(phrases), self.maxlen), -1, dtype=np.int32)
+        for i, tokens in enumerate(phrases):
+            tokens = tokens[:self.maxlen]
+            idx[i, :len(tokens)] = [self._key_to_index.get(token, -1) for token in tokens]
+        return idx
+
+    def train(self, classdict, kerasmodel, nb_epoch=10, streaming=False, batch_size=32):
         """ Train the classifier.
 
         The training data and the corresponding keras model have to be given.
 
+        If `streaming` is set, the embedded vectors are gathered lazily, batch by batch,
+        and streamed into the model through a `tf.data` pipeline, so that the full
+        training tensor, whose size grows with the number of training samples, is never
+        materialized in memory. This permits training data much larger than the RAM.
+
+        If the classifier was constructed with `dtype=numpy.float16`, this sets Keras'
+        global mixed-precision policy to `mixed_float16`, which affects every model
+        built in the process afterwards; call
+        `tf.keras.mixed_precision.set_global_policy('float32')` to restore the default.
+
         If this has not been run, or a model was not loaded by :func:`~loadmodel`,
         a `ModelNotTrainedException` will be raised.
 
         :param classdict: training data
         :param kerasmodel: keras sequential model
         :param nb_epoch: number of steps / epochs in training
+        :param streaming: whether to stream batches of embedded vectors into the model instead of materializing all of them (Default: False)
+        :param batch_size: number of samples per batch when streaming (Default: 32)
         :return: None
         :type classdict: dict
         :type kerasmodel: keras.models.Sequential
         :type nb_epoch: int
+        :type streaming: bool
+        :type batch_size: int
         """
-        # convert classdict to training input vectors
-        self.classlabels, train_embedvec, indices = self.convert_trainingdata_matrix(classdict)
-
-        # train the model
-        kerasmodel.fit(train_embedvec, indices, epochs=nb_epoch)
+        # train in mixed precision when the input is half-precision
+        if self.dtype == np.float16:
+            import tensorflow as tf
+            tf.keras.mixed_precision.set_global_policy('mixed_float16')
+
+        if streaming and self._key_to_index is None:
+            warnings.warn('The word-embedding model has no indexable matrix of vectors; '
+                          'training without streaming.', RuntimeWarning)
+            streaming = False
+
+        if self.use_embedding_layer:
+            # convert classdict to token indices; the embedded vectors are looked up
+            # inside the network by a frozen Embedding layer prepended to it
+            self.classlabels, phrases, label_ids = self._convert_trainingdata_phrases(classdict)
+            token_ids = self._phrases_to_tokenids(phrases) + 1
+            indices = np.eye(len(self.classlabels), dtype=np.float32)[label_ids]
+            kerasmodel = self._prepend_embedding_layer(kerasmodel)
+            kerasmodel.fit(token_ids, indices, epochs=nb_epoch)
+        elif streaming:
+            # convert classdict to token and label indices, and stream the batches
+            self.classlabels, phrases, label_ids = self._convert_trainingdata_phrases(classdict)
+            dataset = self._training_dataset(self._phrases_to_tokenids(phrases), label_ids, batch_size)
+            kerasmodel.fit(dataset, epochs=nb_epoch)
+        else:
+            # convert classdict to training input vectors
+            self.classlabels, train_embedvec, indices = self.convert_trainingdata_matrix(classdict)
+            kerasmodel.fit(train_embedvec, indices, epochs=nb_epoch)
 
         # flag switch
         self.model = kerasmodel
+        self._tflite_interpreter = None
+        self._shorttext_to_matrix_cached.cache_clear()
         self.trained = True
 
-    def savemodel(self, nameprefix):
+    def _prepend_embedding_layer(self, kerasmodel):
+        """ Prepend a frozen embedding layer, holding the word-embedding matrix, to the given model.
+
+        The returned model takes integer token indices as its input, with index 0
+        reserved for out-of-vocabulary tokens and padding (a zero vector), and feeds
+        the looked-up embedded vectors to the layers of the given model.
+        This is called by :func:`~train`.
+
+        :param kerasmodel: keras sequential model consuming matrices of embedded vectors
+        :return: keras sequential model consuming token indices
+        :type kerasmodel: keras.models.Sequential
+        :rtype: keras.models.Sequential
+        """
+        from keras.layers import Embedding
+        from keras.models import Sequential
+
+        vectors = self._embedding_vectors()
+        weights = np.concatenate([np.zeros((1, vectors.shape[1]), dtype=self.dtype), vectors])
+
+        model = Sequential()
+        model.add(Embedding(weights.shape[0],
+                            self.vecsize,
+                            weights=[weights],
+                            input_length=self.maxlen,
+                            trainable=False))
+        for layer in kerasmodel.layers:
+            model.add(layer)
+        model.compile(loss=kerasmodel.loss, optimizer=kerasmodel.optimizer)
+
+        return model
+
+    def _training_dataset(self, token_ids, label_ids, batch_size):
+        """ Wrap token and label indices into a streaming `tf.data` dataset.
+
+        Each batch of embedded vectors is gathered from the word-embedding model only
+        when the batch is consumed, so the memory held is one batch at a time instead
+        of the whole training tensor. This is called by :func:`~train`.
+
+        :param token_ids: rank-2 int32 array of token indices, -1 for OOV/padding
+        :param label_ids: array of label indices
+        :param batch_size: number of samples per batch
+        :return: dataset yielding batches of embedded vectors and one-hot outputs
+        :type token_ids: numpy.ndarray
+        :type label_ids: numpy.ndarray
+        :type batch_size: int
+        :rtype: tensorflow.data.Dataset
+        """
+        import tensorflow as tf
+
+        vectors = self._embedding_vectors()
+        onehot = np.eye(len(self.classlabels), dtype=np.float32)
+        nb_samples = token_ids.shape[0]
+
+        def generate_batches():
+            for k in range(0, nb_samples, batch_size):
+                batch_ids = token_ids[k:k+batch_size]
+                oov = batch_ids < 0
+                batch_embedvec = np.take(vectors, np.where(oov, 0, batch_ids), axis=0)
+                batch_embedvec[oov] = 0
+                yield batch_embedvec, onehot[label_ids[k:k+batch_size]]
+
+        return tf.data.Dataset.from_generator(
+            generate_batches,
+            output_signature=(tf.TensorSpec(shape=(None, self.maxlen, self.vecsize), dtype=self.dtype),
+                              tf.TensorSpec(shape=(None, len(self.classlabels)), dtype=tf.float32))
+        ).prefetch(tf.data.AUTOTUNE)
+
+    def savemodel(self, nameprefix, quantize=None):
         """ Save the trained model into files.
 
         Given the prefix of the file paths, save the model into files, with name given by the prefix.
@@ -114,21 +466,37 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         ending with ".json", and one name ending with ".h5". For shorttext>=0.4.0, another file
         with extension "_config.json" would be created.
 
+        If `quantize` is 'int8', an additional file with extension ".tflite" is produced,
+        holding the model with its weights quantized to 8-bit integers, which is smaller
+        and faster at inference on CPU. :func:`~loadmodel` picks this file up if present.
+        Quantization is only available through this method and :func:`~loadmodel` with
+        a file path prefix; compact model files (:func:`~save_compact_model`) neither
+        carry the quantized model nor accept the `quantize` argument.
+
         If there is no trained model, a `ModelNotTrainedException` will be thrown.
 
         :param nameprefix: prefix of the file path
+        :param quantize: quantization of the saved model, either None or 'int8' (Default: None)
         :return: None
         :type nameprefix: str
+        :type quantize: str
         :raise: ModelNotTrainedException
         """
         if not self.trained:
             raise e.ModelNotTrainedException()
         kerasio.save_model(nameprefix, self.model)
-        labelfile = open(nameprefix+'_classlabels.txt', 'w')
-        labelfile.write('\n'.join(self.classlabels))
-        labelfile.close()
-        json.dump({'with_gensim': False, 'maxlen': self.maxlen, 'vecsize': self.vecsize},
-                  open(nameprefix+'_config.json', 'w'))
+        with open(nameprefix+'_classlabels.txt', 'w') as labelfile:
+            labelfile.write('\n'.join(self.classlabels))
+        with open(nameprefix+'_config.json', 'w') as configfile:
+            json.dump({'with_gensim': False, 'maxlen': self.maxlen, 'vecsize': self.vecsize,
+                       'use_embedding_layer': self.use_embedding_layer},
+                      configfile)
+        if quantize == 'int8':
+            import tensorflow as tf
+            converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            with open(nameprefix+'.tflite', 'wb') as quantizedfile:
+                quantizedfile.write(converter.convert())
 
     def loadmodel(self, nameprefix):
         """ Load a trained model from files.
@@ -140,20 +508,30 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         If this has not been run, or a model was not trained by :func:`~train`,
         a `ModelNotTrainedException` will be raised while performing prediction or saving the model.
 
+        If a quantized model (file with extension ".tflite", produced by
+        :func:`~savemodel` with `quantize='int8'`) exists, it is preferred
+        for prediction over the floating-point Keras model. Such a file is
+        only found when loading from a file path prefix; compact model files
+        (:func:`~load_compact_model`) do not carry it.
+
         :param nameprefix: prefix of the file path
         :return: None
         :type nameprefix: str
         """
         self.model = kerasio.load_model(nameprefix)
-        labelfile = open(nameprefix+'_classlabels.txt', 'r')
-        self.classlabels = labelfile.readlines()
-        labelfile.close()
-        self.classlabels = [s.strip() for s in self.classlabels]
+        if os.path.exists(nameprefix+'.tflite'):
+            import tensorflow as tf
+            self._tflite_interpreter = tf.lite.Interpreter(model_path=nameprefix+'.tflite')
+        else:
+            self._tflite_interpreter = None
+        with open(nameprefix+'_classlabels.txt', 'r') as labelfile:
+            self.classlabels = [s.strip() for s in labelfile]
 
         # check if _config.json exists.
         # This file does not exist if the model was created with shorttext<0.4.0
         if os.path.exists(nameprefix+'_config.json'):
-            config = json.load(open(nameprefix+'_config.json', 'r'))
+            with open(nameprefix+'_config.json', 'r') as configfile:
+                config = json.load(configfile)
             # these fields are present for release >= 1.0.0
             if 'maxlen' in config:
                 self.maxlen = config['maxlen']
@@ -163,6 +541,11 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
                 self.vecsize = config['vecsize']
             else:
                 self.vecsize = self.wvmodel.vector_size
+            self.use_embedding_layer = config.get('use_embedding_layer', False)
+            if self.use_embedding_layer and self._key_to_index is None:
+                warnings.warn('The word-embedding model has no indexable matrix of vectors; '
+                              'feeding embedded vectors instead of token indices.', RuntimeWarning)
+                self.use_embedding_layer = False
             if self.vecsize != self.wvmodel.vector_size:
                 warnings.warn('Record vector size (%i) is not the same as that of the given word-embedding model (%i)! ' % (self.vecsize, self.wvmodel.vector_size)+
                               'Setting the vector size to be %i, but there may be run time error!' % (self.wvmodel.vector_size),
@@ -171,9 +554,12 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         else:
             self.maxlen = 15
             self.vecsize = self.wvmodel.vector_size
+            self.use_embedding_layer = False
             warnings.warn('Model files from old versions.')
 
         self.with_gensim = False
+        self._scratch = threading.local()
+        self._shorttext_to_matrix_cached.cache_clear()
         self.trained = True
 
     def word_to_embedvec(self, word):
@@ -188,7 +574,10 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         :type word: str
         :rtype: numpy.ndarray
         """
-        return self.wvmodel[word] if word in self.wvmodel else np.zeros(self.vecsize)
+        try:
+            return self.wvmodel[word]
+        except KeyError:
+            return self._zero
 
     def shorttext_to_matrix(self, shorttext):
         """ Convert the short text into a matrix with word-embedding representation.
@@ -197,16 +586,49 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         the given word-embedding model, and put them into a matrix. If a word is not in the model,
         that row will be filled with zero.
 
+        The result is memoized in an LRU cache, so repeated calls on the same
+        sentence, common in serving, return the cached matrix without paying
+        tokenization and embedding lookup again.
+
         :param shorttext: a short sentence
         :return: a matrix of embedded vectors that represent all the tokens in the sentence
         :type shorttext: str
         :rtype: numpy.ndarray
         """
-        tokens = tokenize(shorttext)
-        matrix = np.zeros((self.maxlen, self.vecsize))
-        for i in range(min(self.maxlen, len(tokens))):
-            matrix[i] = self.word_to_embedvec(tokens[i])
-        return matrix
+        return self._shorttext_to_matrix_cached(shorttext)
+
+    def _shorttext_to_matrix(self, shorttext):
+        """ Compute the matrix of embedded vectors of a short sentence, uncached.
+
+        The sentence is packed into a preallocated thread-local scratch buffer, so
+        converting a sentence costs no intermediate allocation, and concurrent
+        scoring threads each write into their own buffer; only the returned copy
+        is allocated, which is required as the result outlives the next call.
+        This is called through the LRU cache of :func:`~shorttext_to_matrix`.
+
+        :param shorttext: a short sentence
+        :return: a matrix of embedded vectors that represent all the tokens in the sentence
+        :type shorttext: str
+        :rtype: numpy.ndarray
+        """
+        scratch = getattr(self._scratch, 'matrix', None)
+        if scratch is None or scratch.shape != (self.maxlen, self.vecsize) or scratch.dtype != self.dtype:
+            scratch = np.zeros((self.maxlen, self.vecsize), dtype=self.dtype)
+            self._scratch.matrix = scratch
+        else:
+            scratch.fill(0)
+
+        tokens = tokenize(shorttext)[:self.maxlen]
+        if self._key_to_index is None:
+            for i, token in enumerate(tokens):
+                scratch[i] = self.word_to_embedvec(token)
+        else:
+            for i, token in enumerate(tokens):
+                tokid = self._key_to_index.get(token, -1)
+                if tokid >= 0:
+                    scratch[i] = self.wvmodel.vectors[tokid]
+
+        return scratch.copy()
 
     def score(self, shorttext):
         """ Calculate the scores for all the class labels for the given short sentence.
@@ -222,20 +644,69 @@ class VarNNEmbeddedVecClassifier(CompactIOMachine):
         :rtype: dict
         :raise: ModelNotTrainedException
         """
+        return self.score_batch([shorttext])[0]
+
+    def score_batch(self, shorttexts):
+        """ Calculate the scores for all the class labels for the given short sentences.
+
+        Given a list of short sentences, convert all of them into one batch of embedded
+        matrices, and run the neural network model once over the whole batch, so that
+        the fixed overhead of a `predict` call is shared by all the sentences.
+        It returns a list of dictionaries, one for each sentence in the given order,
+        with keys being the class labels, and values being the scores.
+        If a short sentence is empty, or if other numerical errors occur, the score will be `numpy.nan`.
+        If neither :func:`~train` nor :func:`~loadmodel` was run, it will raise `ModelNotTrainedException`.
+
+        :param shorttexts: list of short sentences
+        :return: list of dictionaries with keys being the class labels, and values being the corresponding classification scores
+        :type shorttexts: list
+        :rtype: list
+        :raise: ModelNotTrainedException
+        """
         if not self.trained:
             raise e.ModelNotTrainedException()
-
-        # retrieve vector
-        matrix = np.array([self.shorttext_to_matrix(shorttext)])
+        if len(shorttexts) == 0:
+            return []
+
+        # retrieve token indices or embedded vectors for the whole batch;
+        # single-sentence scoring, the common serving case, goes through the
+        # memoization of shorttext_to_matrix
+        if self.use_embedding_layer:
+            matrix = self._phrases_to_tokenids([tokenize(shorttext) for shorttext in shorttexts]) + 1
+        elif len(shorttexts) == 1:
+            matrix = self.shorttext_to_matrix(shorttexts[0])[np.newaxis]
+        else:
+            matrix = self.phrases_to_embedmatrix([tokenize(shorttext) for shorttext in shorttexts])
 
         # classification using the neural network
-        predictions = self.model.predict(matrix)
+        if self._tflite_interpreter != None:
+            predictions = self._predict_quantized(matrix)
+        else:
+            predictions = self.model.predict(matrix, batch_size=len(shorttexts), verbose=0)
 
         # wrangle output result
-        scoredict = {classlabel: predictions[0][idx]
-                     for idx, classlabel in zip(range(len(self.classlabels)), self.classlabels)}
+        scoredicts = [dict(zip(self.classlabels, prediction.tolist())) for prediction in predictions]
+
+        return scoredicts
+
+    def _predict_quantized(self, matrix):
+        """ Run the quantized TFLite model over the given batch of embedded matrices.
 
-        return scoredict
+        The input tensor is resized to the batch, so batches of any size can be scored.
+
+        :param matrix: rank-3 array of embedded vectors representing a batch of sentences
+        :return: prediction scores, one row per sentence
+        :type matrix: numpy.ndarray
+        :rtype: numpy.ndarray
+        """
+        interpreter = self._tflite_interpreter
+        input_detail = interpreter.get_input_details()[0]
+        output_detail = interpreter.get_output_details()[0]
+        interpreter.resize_tensor_input(input_detail['index'], matrix.shape)
+        interpreter.allocate_tensors()
+        interpreter.set_tensor(input_detail['index'], matrix.astype(input_detail['dtype'], copy=False))
+        interpreter.invoke()
+        return interpreter.get_tensor(output_detail['index'])
 
 
 def load_varnnlibvec_classifier(wvmodel, name, compact=True, vecsize=None):
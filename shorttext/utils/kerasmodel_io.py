@@ -15,7 +15,8 @@ def save_model(nameprefix, model):
     :type model: keras.models.Model
     """
     model_json = model.to_json()
-    open(nameprefix+'.json', 'w').write(model_json)
+    with open(nameprefix+'.json', 'w') as architecturefile:
+        architecturefile.write(model_json)
     model.save_weights(nameprefix+'.h5')
 
 
@@ -30,6 +31,7 @@ def load_model(nameprefix):
     :type nameprefix: str
     :rtype: keras.models.Model
     """
-    model = model_from_json(open(nameprefix+'.json', 'r').read())
+    with open(nameprefix+'.json', 'r') as architecturefile:
+        model = model_from_json(architecturefile.read())
     model.load_weights(nameprefix+'.h5')
     return model
\ No newline at end of file
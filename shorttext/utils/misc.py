@@ -1,5 +1,51 @@
 
 import sys
+from functools import lru_cache
+
+import numpy as np
+
+# opt_einsum is optional; without it, contractions run through numpy.einsum
+# with an optimized contraction path
+try:
+    from opt_einsum import contract as opt_einsum_contract
+except ImportError:
+    opt_einsum_contract = None
+
+
+@lru_cache(maxsize=4096)
+def _einsum_path(expr, shapes):
+    """ Return the optimal contraction path for the given einsum expression and operand shapes.
+
+    :param expr: einsum subscript expression
+    :param shapes: tuple of the shapes of the operands
+    :return: contraction path for `numpy.einsum`
+    :type expr: str
+    :type shapes: tuple
+    :rtype: list
+    """
+    path, _ = np.einsum_path(expr, *[np.empty(shape) for shape in shapes], optimize='optimal')
+    return path
+
+
+def contract(expr, *arrs):
+    """ Contract the given arrays according to an einsum expression.
+
+    The contraction is routed through `opt_einsum` if it is installed, and through
+    `numpy.einsum` with an optimized contraction path otherwise, so that multi-tensor
+    contractions are executed as BLAS matrix multiplications instead of nested loops.
+    The contraction path is cached on the expression and the shapes of the operands.
+
+    :param expr: einsum subscript expression
+    :param arrs: arrays to be contracted
+    :return: the contracted array
+    :type expr: str
+    :type arrs: numpy.ndarray
+    :rtype: numpy.ndarray
+    """
+    if opt_einsum_contract is not None:
+        return opt_einsum_contract(expr, *arrs)
+    return np.einsum(expr, *arrs, optimize=_einsum_path(expr, tuple(arr.shape for arr in arrs)))
+
 
 def textfile_generator(textfile, linebreak=True, encoding=None):
     """ Return a generator that reads lines in a text file.
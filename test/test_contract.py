@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from shorttext.utils import misc
+
+
+class TestContract(unittest.TestCase):
+    def testMatchEinsum(self):
+        a = np.random.uniform(size=(4, 5))
+        b = np.random.uniform(size=(5, 6))
+        c = np.random.uniform(size=(6, 3))
+        np.testing.assert_allclose(misc.contract('ij,jk,kl->il', a, b, c),
+                                   np.einsum('ij,jk,kl->il', a, b, c))
+
+    def testNumpyFallbackPathCache(self):
+        # force the numpy fallback, regardless of whether opt_einsum is installed
+        saved_contract = misc.opt_einsum_contract
+        misc.opt_einsum_contract = None
+        try:
+            misc._einsum_path.cache_clear()
+            a = np.random.uniform(size=(3, 4))
+            b = np.random.uniform(size=(4, 2))
+            np.testing.assert_allclose(misc.contract('ij,jk->ik', a, b),
+                                       np.einsum('ij,jk->ik', a, b))
+            misc.contract('ij,jk->ik', a, b)
+            self.assertEqual(misc._einsum_path.cache_info().hits, 1)
+            self.assertEqual(misc._einsum_path.cache_info().misses, 1)
+        finally:
+            misc.opt_einsum_contract = saved_contract
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -44,6 +44,31 @@ class TestVarNNEmbeddedVecClassifier(unittest.TestCase):
         score_vals = main_classifier.score('artificial intelligence')
         self.assertAlmostEqual(score_vals['mathematics'] + score_vals['physics'] + score_vals['theology'], 1.0, 1)
 
+        # batch scoring is consistent with single-sentence scoring
+        batch_score_vals = main_classifier.score_batch(['artificial intelligence', 'linear algebra'])
+        self.assertEqual(len(batch_score_vals), 2)
+        self.comparedict(batch_score_vals[0], main_classifier.score('artificial intelligence'))
+        self.comparedict(batch_score_vals[1], main_classifier.score('linear algebra'))
+        self.assertEqual(main_classifier.score_batch([]), [])
+
+    def testCNNWordEmbedWithEmbeddingLayer(self):
+        print("Testing CNN with embedding layer...")
+        # create keras model using `CNNWordEmbed` class
+        print("\tKeras model")
+        keras_model = shorttext.classifiers.frameworks.CNNWordEmbed(wvmodel=self.w2v_model,
+                                                                    nb_labels=len(self.trainclass_dict.keys()))
+
+        # create and train classifier fed with token indices through a frozen embedding layer
+        print("\tTraining")
+        main_classifier = shorttext.classifiers.VarNNEmbeddedVecClassifier(self.w2v_model,
+                                                                           use_embedding_layer=True)
+        main_classifier.train(self.trainclass_dict, keras_model, nb_epoch=2)
+
+        # compute classification score
+        print("\tTesting")
+        score_vals = main_classifier.score('artificial intelligence')
+        self.assertAlmostEqual(score_vals['mathematics'] + score_vals['physics'] + score_vals['theology'], 1.0, 1)
+
     def testDoubleCNNWordEmbedWithoutGensim(self):
         print("Testing DoubleCNN...")
         # create keras model using `DoubleCNNWordEmbed` class